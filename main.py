@@ -1,15 +1,23 @@
 import os
 import base64
 import tempfile
+import shutil
 import json
 import logging
 import time
 import re
 import unicodedata
 import threading
-from typing import Optional, List
+import multiprocessing
+import uuid
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import IO, Iterable, Iterator, Optional, List
+from html import unescape as html_unescape
 from urllib.parse import urljoin, urlparse
-from itertools import product
+from itertools import chain
+from datetime import datetime, timedelta, timezone
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -18,15 +26,17 @@ from io import BytesIO
 from openpyxl import load_workbook
 
 import dropbox
-from dropbox.files import WriteMode
+from dropbox.files import CommitInfo, CreateFolderError, FileMetadata, RelocationPath, UploadSessionCursor, UploadSessionFinishArg, WriteMode
 
-import io
 import pikepdf
+from pikepdf import PasswordError, PdfError
+import orjson
 
-from flask import Flask, request, jsonify, url_for, send_from_directory, render_template_string
-from bs4 import BeautifulSoup
+from flask import Flask, request, jsonify, url_for, send_file
+from flask.json.provider import DefaultJSONProvider
+from bs4 import BeautifulSoup, SoupStrainer
 from werkzeug.exceptions import HTTPException
-from stats_runtime import StatsStore, PROVINCES
+from stats_runtime import StatsStore, PROVINCES, utc_now_iso
 
 from io import BytesIO
 from openpyxl import Workbook
@@ -36,7 +46,28 @@ from openpyxl.utils import get_column_letter
 # -----------------------------------------------------------------------------
 # Flask app & logging
 # -----------------------------------------------------------------------------
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson (faster encode/decode). Dates still go
+    through Flask's default, so they keep the HTTP-date format; unlike the
+    stdlib provider, non-ASCII text is emitted as raw UTF-8, not \\uXXXX escapes.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 86400  # favicon and /static
 
 IDEMPOTENCY_TTL_SECONDS = max(60, int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "900")))
 _idempotency_lock = threading.Lock()
@@ -110,7 +141,7 @@ def dropbox_download_file(dropbox_path, token):
         'Dropbox-API-Arg': json.dumps({'path': dropbox_path})
     }
 
-    resp = requests.post(url, headers=headers)
+    resp = dropbox_api_session.post(url, headers=headers, timeout=DEFAULT_TIMEOUT)
     if resp.status_code != 200:
         raise Exception(f'Dropbox download error {resp.status_code}: {resp.text}')
 
@@ -121,10 +152,10 @@ def dropbox_get_metadata(dropbox_path, token):
     url = 'https://api.dropboxapi.com/2/files/get_metadata'
     headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
     payload = {'path': dropbox_path, 'include_deleted': False}
-    resp = requests.post(url, headers=headers, json=payload)
+    resp = dropbox_api_session.post(url, headers=headers, json=payload, timeout=DEFAULT_TIMEOUT)
     if resp.status_code != 200:
         raise Exception(f'Dropbox metadata error {resp.status_code}: {resp.text}')
-    return resp.json()
+    return orjson.loads(resp.content)
 
 
 def dropbox_download_file_cached(dropbox_path, token):
@@ -182,11 +213,11 @@ def dropbox_upload_file(dropbox_path, file_bytes, token):
         })
     }
 
-    resp = requests.post(url, headers=headers, data=file_bytes)
+    resp = dropbox_api_session.post(url, headers=headers, data=file_bytes, timeout=DEFAULT_TIMEOUT)
     if resp.status_code != 200:
         raise Exception(f'Dropbox upload error {resp.status_code}: {resp.text}')
 
-    return resp.json()
+    return orjson.loads(resp.content)
 
 
 def safe_sheet_name(name, fallback):
@@ -264,23 +295,60 @@ app.logger.setLevel(logging.INFO)
 # -----------------------------------------------------------------------------
 # HTTP session with timeouts and retries
 # -----------------------------------------------------------------------------
-DEFAULT_TIMEOUT = 30
+# (connect, read): a dead host fails within seconds, a slow body still gets 30s
+HTTP_CONNECT_TIMEOUT = max(1.0, float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")))
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, 30)
+PDF_DOWNLOAD_WORKERS = max(1, int(os.getenv("PDF_DOWNLOAD_WORKERS", "16")))
+PDF_PROBE_WORKERS = max(1, int(os.getenv("PDF_PROBE_WORKERS", "32")))
+
+HTTP_POOL_SIZE = max(PDF_DOWNLOAD_WORKERS, PDF_PROBE_WORKERS, int(os.getenv("HTTP_POOL_SIZE", "64")))
+
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(408, 429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "POST", "HEAD", "OPTIONS"]),
+    respect_retry_after_header=True,
+)
+# One adapter for both schemes; pool sized for the PDF download/probe fan-out
+# so concurrent fetches to the same host reuse keep-alive sockets instead of
+# opening (and discarding) surplus connections.
+_ADAPTER = HTTPAdapter(
+    pool_connections=HTTP_POOL_SIZE,
+    pool_maxsize=HTTP_POOL_SIZE,
+    pool_block=True,
+    max_retries=_RETRY,
+)
 
 def _requests_session() -> requests.Session:
     s = requests.Session()
-    s.headers.update({"User-Agent": "AR-server/1.1"})
-    retries = Retry(
-        total=3,
-        backoff_factor=0.5,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=frozenset(["GET", "POST", "HEAD", "OPTIONS"])
-    )
-    s.mount("http://", HTTPAdapter(max_retries=retries))
-    s.mount("https://", HTTPAdapter(max_retries=retries))
+    s.headers.update({"User-Agent": "AR-server/1.1", "Connection": "keep-alive"})
+    s.mount("http://", _ADAPTER)
+    s.mount("https://", _ADAPTER)
     return s
 
 session = _requests_session()
 
+# Dropbox answers bursts with 429 + Retry-After; give its API calls a longer,
+# header-driven retry budget than the cheap one used for provincial sites.
+# backoff_max keeps the exponential part short, so waits follow Retry-After.
+DROPBOX_MAX_RETRIES = 8
+_DROPBOX_RETRY = Retry(
+    total=DROPBOX_MAX_RETRIES,
+    backoff_factor=1.0,
+    backoff_max=10,
+    status_forcelist=(408, 429, 500, 502, 503, 504),
+    allowed_methods=None,
+    respect_retry_after_header=True,
+)
+_DROPBOX_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=HTTP_POOL_SIZE,
+    max_retries=_DROPBOX_RETRY,
+)
+dropbox_api_session = requests.Session()
+dropbox_api_session.mount("https://", _DROPBOX_ADAPTER)
+
 # -----------------------------------------------------------------------------
 # Utility routes
 # -----------------------------------------------------------------------------
@@ -288,21 +356,22 @@ session = _requests_session()
 def healthz():
     return "ok", 200
 
+_STATIC_PATH = os.path.join(app.root_path, "static")
+_FAVICON_PATH = os.path.join(_STATIC_PATH, "favicon.png")
+_FAVICON_EXISTS = os.path.exists(_FAVICON_PATH)
+
 @app.route("/favicon.ico")
 def favicon():
-    static_path = os.path.join(app.root_path, "static")
-    fav = os.path.join(static_path, "favicon.png")
-    if os.path.exists(fav):
-        return send_from_directory(static_path, "favicon.png", mimetype="image/png")
-    return "", 204
+    if not _FAVICON_EXISTS:
+        return "", 204
+    # Path is fixed at import (no per-request safe_join); ETag/Last-Modified allow 304s
+    return send_file(_FAVICON_PATH, mimetype="image/png", conditional=True)
 
 # -----------------------------------------------------------------------------
 # Main page
 # -----------------------------------------------------------------------------
 
-@app.route("/")
-def index():
-    return render_template_string("""
+INDEX_HTML = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -865,28 +934,108 @@ def index():
   </script>
 </body>
 </html>
-""")
+"""
+
+# The page has no template variables: serve the literal HTML (no Jinja) with a
+# precomputed ETag so repeat visits can be answered with 304 Not Modified.
+_INDEX_ETAG = hashlib.sha1(INDEX_HTML.encode("utf-8")).hexdigest()
+
+
+@app.route("/")
+def index():
+    resp = app.response_class(
+        INDEX_HTML,
+        mimetype="text/html",
+        headers={"Cache-Control": "public, max-age=300"},
+    )
+    resp.set_etag(_INDEX_ETAG)
+    return resp.make_conditional(request)
 
 
 
 # -----------------------------------------------------------------------------
 # Dropbox helpers
 # -----------------------------------------------------------------------------
-def get_dropbox_access_token() -> str:
+DROPBOX_TOKEN_REFRESH_MARGIN_SECONDS = 60
+_dropbox_token_lock = threading.Lock()
+_dropbox_token: dict[str, object] = {"value": None, "expires_at": 0.0, "expires_utc": None}
+
+
+@functools.lru_cache(maxsize=1)
+def _dropbox_app_credentials() -> tuple[str, str, str]:
+    """(client id, client secret, refresh token) from the env; read once, errors stay lazy."""
     cid = os.getenv("DROPBOX_CLIENT_ID")
     csec = os.getenv("DROPBOX_CLIENT_SECRET")
     rtok = os.getenv("DROPBOX_REFRESH_TOKEN")
     if not all([cid, csec, rtok]):
         raise RuntimeError("Missing Dropbox credentials")
-    auth = base64.b64encode(f"{cid}:{csec}".encode()).decode()
-    resp = session.post(
-        "https://api.dropbox.com/oauth2/token",
-        data={"grant_type": "refresh_token", "refresh_token": rtok},
-        headers={"Authorization": f"Basic {auth}"},
-        timeout=DEFAULT_TIMEOUT,
-    )
-    resp.raise_for_status()
-    return resp.json()["access_token"]
+    return str(cid), str(csec), str(rtok)
+
+
+@functools.lru_cache(maxsize=1)
+def _dropbox_refresh_auth() -> tuple[str, str]:
+    """(Basic auth header value, refresh token) for the token endpoint."""
+    cid, csec, rtok = _dropbox_app_credentials()
+    return "Basic " + base64.b64encode(f"{cid}:{csec}".encode()).decode(), rtok
+
+
+def get_dropbox_access_token() -> str:
+    """Return a cached short-lived access token, refreshing it shortly before expiry."""
+    with _dropbox_token_lock:
+        cached = _dropbox_token.get("value")
+        if cached and time.monotonic() < float(_dropbox_token["expires_at"]) - DROPBOX_TOKEN_REFRESH_MARGIN_SECONDS:
+            return str(cached)
+
+        auth, rtok = _dropbox_refresh_auth()
+        # Runs under _dropbox_token_lock: use the cheap retry policy so a flaky
+        # token endpoint cannot stall every request thread for minutes.
+        resp = session.post(
+            "https://api.dropbox.com/oauth2/token",
+            data={"grant_type": "refresh_token", "refresh_token": rtok},
+            headers={"Authorization": auth},
+            timeout=DEFAULT_TIMEOUT,
+        )
+        resp.raise_for_status()
+        body = orjson.loads(resp.content)
+        expires_in = float(body.get("expires_in", 14400) or 0)
+        _dropbox_token["value"] = body["access_token"]
+        _dropbox_token["expires_at"] = time.monotonic() + expires_in
+        # The SDK compares expiry against naive UTC
+        _dropbox_token["expires_utc"] = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=expires_in)
+        return body["access_token"]
+
+
+# One pooled session for all Dropbox SDK clients so TLS connections to
+# api/content.dropboxapi.com stay warm across requests. The SDK does its own
+# retrying (and sleeps for Retry-After on 429), so this keeps the SDK's pinned
+# adapter and its default 5xx retries, and only bounds the 429 retries via
+# DROPBOX_MAX_RETRIES.
+_dropbox_http = dropbox.create_session(max_connections=HTTP_POOL_SIZE)
+_dropbox_client_lock = threading.Lock()
+_dropbox_client: dict[str, object] = {"token": None, "client": None}
+
+
+def get_dbx() -> dropbox.Dropbox:
+    """
+    Return a Dropbox client for the current cached token, rebuilt only when the
+    token changes. The client also holds the refresh credentials, so the SDK
+    renews the token itself when a long job outlives it.
+    """
+    token = get_dropbox_access_token()
+    cid, csec, rtok = _dropbox_app_credentials()
+    with _dropbox_client_lock:
+        if _dropbox_client["token"] != token or _dropbox_client["client"] is None:
+            _dropbox_client["client"] = dropbox.Dropbox(
+                oauth2_access_token=token,
+                oauth2_access_token_expiration=_dropbox_token["expires_utc"],
+                oauth2_refresh_token=rtok,
+                app_key=cid,
+                app_secret=csec,
+                session=_dropbox_http,
+                max_retries_on_rate_limit=DROPBOX_MAX_RETRIES,
+            )
+            _dropbox_client["token"] = token
+        return _dropbox_client["client"]  # type: ignore[return-value]
 
 # -----------------------------------------------------------------------------
 # Stats storage (JSON in the same folder as this script)
@@ -912,6 +1061,7 @@ def get_stats_store() -> StatsStore:
             local_path=STATS_LOCAL_PATH,
             logger=app.logger,
             token_provider=get_dropbox_access_token,
+            client_provider=get_dbx,
         )
     return _stats_store
 
@@ -934,126 +1084,508 @@ def track_download_stats(
             success=success,
         )
     except Exception as e:
-        app.logger.warning(f"Stats update failed: {e}")
+        app.logger.warning("Stats update failed: %s", e)
 
 
 def track_asx_stats(action: str, count: int, success: bool) -> None:
     try:
         get_stats_store().apply_asx_event(action=action, count=count, success=success)
     except Exception as e:
-        app.logger.warning(f"ASX stats update failed: {e}")
+        app.logger.warning("ASX stats update failed: %s", e)
 
-def ensure_folder(dbx: dropbox.Dropbox, path: str) -> None:
-    """Create folder if needed; ignore conflict when already created concurrently."""
-    try:
-        dbx.files_get_metadata(path)
-        return
-    except dropbox.exceptions.ApiError:
-        pass
 
+DROPBOX_JOB_POLL_ATTEMPTS = 10
+
+
+def dropbox_wait_job(check_fn, job_id: str):
+    """Poll a Dropbox async batch job with exponential backoff until it leaves in_progress."""
+    delay = 0.25
+    for _ in range(DROPBOX_JOB_POLL_ATTEMPTS):
+        status = check_fn(job_id)
+        if not status.is_in_progress():
+            return status
+        time.sleep(delay)
+        delay = min(delay * 2, 4.0)
+    raise RuntimeError(f"Dropbox job {job_id} still in progress after {DROPBOX_JOB_POLL_ATTEMPTS} checks")
+
+
+def ensure_folder(dbx: dropbox.Dropbox, path: str) -> None:
+    """Create folder in one call; a path/conflict (already exists or created concurrently) is success."""
     try:
         dbx.files_create_folder_v2(path)
     except dropbox.exceptions.ApiError as e:
-        if "conflict" not in str(e).lower() and "folder" not in str(e).lower():
+        err = e.error
+        if not (isinstance(err, CreateFolderError) and err.is_path() and err.get_path().is_conflict()):
             raise
 
+
+def ensure_folders(dbx: dropbox.Dropbox, paths: List[str]) -> None:
+    """Create several folders with one files_create_folder_batch call; conflicts are ignored."""
+    launch = dbx.files_create_folder_batch(paths, autorename=False)
+    if launch.is_async_job_id():
+        status = dropbox_wait_job(dbx.files_create_folder_batch_check, launch.get_async_job_id())
+        if not status.is_complete():
+            raise RuntimeError(f"Dropbox folder batch failed: {status}")
+        result = status.get_complete()
+    elif launch.is_complete():
+        result = launch.get_complete()
+    else:
+        raise RuntimeError(f"Dropbox folder batch failed: {launch}")
+
+    for path, entry in zip(paths, result.entries):
+        if entry.is_success():
+            continue
+        err = entry.get_failure()
+        if err.is_path() and err.get_path().is_conflict():
+            continue
+        raise RuntimeError(f"Create folder failed [{path}]: {err}")
+
+
+AR_ROOT = "/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS"
+AR_NEW_REPORTS_DIR = f"{AR_ROOT}/1 - NEW REPORTS"
+AR_TEMPLATES_DIR = f"{AR_ROOT}/_Documents/Instructions"
+# (label, template source, destination pattern formatted with base/instr/ar)
+AR_TEMPLATE_COPIES = (
+    ("Instructions", f"{AR_TEMPLATES_DIR}/01_Instructions.xlsx", "{instr}/{ar}_Instructions.xlsx"),
+    ("Geochemistry", f"{AR_TEMPLATES_DIR}/ReportID_Geochemistry.gdb", "{base}/{ar}_Geochemistry.gdb"),
+    ("DDH", f"{AR_TEMPLATES_DIR}/ReportID_DDH.gdb", "{base}/{ar}_DDH.gdb"),
+)
+
+
+def copy_report_templates(dbx: dropbox.Dropbox, ar_number: str, base: str, instr: str,
+                          log_prefix: str = "") -> int:
+    """
+    Copy the per-report templates (Instructions.xlsx, Geochemistry.gdb, DDH.gdb)
+    with one files_copy_batch_v2 call. Returns the number of successful copies.
+    """
+    copies = [
+        (label, src, dst.format(base=base, instr=instr, ar=ar_number))
+        for label, src, dst in AR_TEMPLATE_COPIES
+    ]
+    try:
+        launch = dbx.files_copy_batch_v2(
+            [RelocationPath(from_path=src, to_path=dst) for _, src, dst in copies], autorename=False)
+        if launch.is_async_job_id():
+            result = dropbox_wait_job(dbx.files_copy_batch_check_v2, launch.get_async_job_id()).get_complete()
+        else:
+            result = launch.get_complete()
+    except (dropbox.exceptions.ApiError, RuntimeError) as e:
+        app.logger.warning("%stemplate copy failed: %s", log_prefix, e)
+        return 0
+
+    count = 0
+    for (label, _, _), entry in zip(copies, result.entries):
+        if entry.is_success():
+            count += 1
+        else:
+            failure = entry.get_failure() if entry.is_failure() else "unknown error"
+            app.logger.warning("%s%s copy failed: %s", log_prefix, label, failure)
+    return count
+
+
+DROPBOX_UPLOAD_BATCH_SIZE = 1000  # max entries per files_upload_session_finish_batch_v2 call
+DROPBOX_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _upload_session_push(dbx: dropbox.Dropbox, session_id: Optional[str], offset: int,
+                         chunk: bytes, close: bool) -> tuple[str, int]:
+    if session_id is None:
+        session_id = dbx.files_upload_session_start(chunk, close=close).session_id
+    else:
+        dbx.files_upload_session_append_v2(
+            chunk, UploadSessionCursor(session_id=session_id, offset=offset), close=close)
+    return session_id, offset + len(chunk)
+
+
+def _stream_to_upload_session(dbx: dropbox.Dropbox, url: str, dropbox_path: str,
+                              headers: Optional[dict] = None,
+                              meta: Optional[dict] = None) -> Optional[UploadSessionFinishArg]:
+    """
+    Stream *url* into a Dropbox upload session chunk by chunk, so at most one
+    chunk per file is held in memory. Returns the finish arg for the batch
+    commit, or None if the URL is missing, empty or fails. *meta*, if given,
+    receives the response validators, or not_modified=True on a 304.
+    """
+    session_id: Optional[str] = None
+    offset = 0
+    try:
+        with session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT, stream=True) as r:
+            if r.status_code == 304 and meta is not None:
+                meta["not_modified"] = True
+                return None
+            r.raise_for_status()
+            if meta is not None:
+                meta["etag"] = r.headers.get("ETag")
+                meta["last_modified"] = r.headers.get("Last-Modified")
+            pending: Optional[bytes] = None
+            for chunk in r.iter_content(chunk_size=DROPBOX_UPLOAD_CHUNK_SIZE):
+                if not chunk:
+                    continue
+                if pending is not None:
+                    session_id, offset = _upload_session_push(dbx, session_id, offset, pending, close=False)
+                pending = chunk
+            if pending is None:
+                return None
+            # The last chunk closes the session, as finish_batch requires.
+            session_id, offset = _upload_session_push(dbx, session_id, offset, pending, close=True)
+    except requests.HTTPError:
+        return None
+    except Exception as e:
+        app.logger.error("PDF transfer error [%s]: %s", url, e)
+        return None
+    return UploadSessionFinishArg(
+        cursor=UploadSessionCursor(session_id=session_id, offset=offset),
+        commit=CommitInfo(path=dropbox_path, mode=WriteMode.overwrite),
+    )
+
+
+def _upload_chunks(dbx: dropbox.Dropbox, chunks: Iterator[bytes], dropbox_path: str) -> bool:
+    """
+    Upload a chunk iterator to *dropbox_path* without joining it in memory.
+    A body that fits in one chunk goes up with a single files_upload; larger
+    ones use an upload session. Returns False for an empty body.
+    """
+    chunks = (c for c in chunks if c)
+    first = next(chunks, None)
+    if first is None:
+        return False
+    pending = next(chunks, None)
+    if pending is None:
+        dbx.files_upload(first, dropbox_path, mode=WriteMode.overwrite)
+        return True
+    session_id, offset = _upload_session_push(dbx, None, 0, first, close=False)
+    for chunk in chunks:
+        session_id, offset = _upload_session_push(dbx, session_id, offset, pending, close=False)
+        pending = chunk
+    dbx.files_upload_session_finish(
+        pending,
+        UploadSessionCursor(session_id=session_id, offset=offset),
+        CommitInfo(path=dropbox_path, mode=WriteMode.overwrite),
+    )
+    return True
+
+
+def dropbox_upload_fileobj(dbx: dropbox.Dropbox, fileobj: IO[bytes], dropbox_path: str) -> bool:
+    """Upload a readable file object in DROPBOX_UPLOAD_CHUNK_SIZE pieces."""
+    return _upload_chunks(dbx, iter(lambda: fileobj.read(DROPBOX_UPLOAD_CHUNK_SIZE), b""), dropbox_path)
+
+
+def stream_to_dropbox(dbx: dropbox.Dropbox, url: str, dropbox_path: str) -> bool:
+    """
+    Stream one URL straight into Dropbox without buffering the whole body.
+    Returns False on an HTTP error status or an empty body; transport and
+    Dropbox errors propagate.
+    """
+    with session.get(url, timeout=DEFAULT_TIMEOUT, stream=True) as r:
+        try:
+            r.raise_for_status()
+        except requests.HTTPError:
+            return False
+        return _upload_chunks(dbx, r.iter_content(chunk_size=DROPBOX_UPLOAD_CHUNK_SIZE), dropbox_path)
+
+
+# Validators (ETag / Last-Modified) of PDFs this process committed, keyed by
+# lowercased Dropbox path, so a re-run can ask the source for a 304 instead of
+# downloading and re-uploading an unchanged file.
+PDF_VALIDATOR_CACHE_MAX_ENTRIES = 4096
+_pdf_validators_lock = threading.Lock()
+_pdf_validators: dict[str, dict[str, Optional[str]]] = {}
+
+
+def _conditional_headers(url: str, dropbox_path: str) -> Optional[dict]:
+    with _pdf_validators_lock:
+        known = _pdf_validators.get(dropbox_path.lower())
+    if not known or known.get("url") != url:
+        return None
+    headers = {}
+    if known.get("etag"):
+        headers["If-None-Match"] = known["etag"]
+    if known.get("last_modified"):
+        headers["If-Modified-Since"] = known["last_modified"]
+    return headers or None
+
+
+def _remember_validators(url: str, dropbox_path: str, meta: dict) -> None:
+    if not (meta.get("etag") or meta.get("last_modified")):
+        return
+    with _pdf_validators_lock:
+        if len(_pdf_validators) >= PDF_VALIDATOR_CACHE_MAX_ENTRIES:
+            _pdf_validators.pop(next(iter(_pdf_validators)), None)
+        _pdf_validators[dropbox_path.lower()] = {
+            "url": url, "etag": meta.get("etag"), "last_modified": meta.get("last_modified"),
+        }
+
+
+def _dropbox_file_exists(dbx: dropbox.Dropbox, dropbox_path: str) -> bool:
+    try:
+        return isinstance(dbx.files_get_metadata(dropbox_path), FileMetadata)
+    except dropbox.exceptions.ApiError:
+        return False
+
+
+def _stage_pdf(dbx: dropbox.Dropbox, urls: tuple[str, ...], dropbox_path: str) -> tuple[object, dict]:
+    """
+    Stage one PDF for the batch commit from the first of *urls* that delivers
+    it (the others are fallbacks, e.g. a page link that 404s). Returns
+    (finish_arg_or_None, meta); meta["url"] is the URL used, and
+    meta["unchanged"] is set when the source answered 304 for a file we
+    committed earlier and that file is still in Dropbox.
+    """
+    for url in urls:
+        meta: dict = {"url": url}
+        headers = _conditional_headers(url, dropbox_path)
+        arg = _stream_to_upload_session(dbx, url, dropbox_path, headers=headers, meta=meta)
+        if meta.pop("not_modified", False):
+            if _dropbox_file_exists(dbx, dropbox_path):
+                meta["unchanged"] = True
+                return None, meta
+            # Moved or deleted on the Dropbox side: fetch it again in full
+            arg = _stream_to_upload_session(dbx, url, dropbox_path, meta=meta)
+        if arg is not None:
+            return arg, meta
+    return None, {}
+
+
+def dropbox_upload_urls(dbx: dropbox.Dropbox, sources: List[tuple[tuple[str, ...], str]],
+                        stats_out: dict | None = None) -> int:
+    """
+    Transfer (alternative urls, dropbox_path) pairs: each file is streamed in
+    parallel into its own upload session, from the first URL that works, then all sessions are committed with
+    files_upload_session_finish_batch_v2 — one commit call instead of one
+    files_upload per file, which also avoids too_many_write_operations.
+    PDFs unchanged since this process last committed them are skipped and
+    counted in stats_out["pdfs_up_to_date"]. Returns the number of files committed.
+    """
+    if not sources:
+        return 0
+
+    staged: list = [(None, {})] * len(sources)
+    with ThreadPoolExecutor(max_workers=min(PDF_DOWNLOAD_WORKERS, len(sources))) as pool:
+        futures = {pool.submit(_stage_pdf, dbx, urls, dst): i for i, (urls, dst) in enumerate(sources)}
+        for done, fut in enumerate(as_completed(futures), 1):
+            i = futures[fut]
+            try:
+                staged[i] = fut.result()
+            except Exception as e:
+                # Drop only this PDF; the other staged sessions still get committed
+                app.logger.error("PDF transfer error [%s]: %s", sources[i][1], e)
+            report_job_progress(pdfs_total=len(sources), pdfs_transferred=done)
+
+    up_to_date = 0
+    entries = []
+    for arg, meta in staged:
+        if meta.get("unchanged"):
+            up_to_date += 1
+        elif arg is not None:
+            entries.append((meta["url"], arg, meta))
+    if up_to_date:
+        app.logger.info("Skipped %d unchanged PDF(s)", up_to_date)
+    if isinstance(stats_out, dict):
+        stats_out["pdfs_up_to_date"] = up_to_date
+
+    count = 0
+
+    for i in range(0, len(entries), DROPBOX_UPLOAD_BATCH_SIZE):
+        chunk = entries[i:i + DROPBOX_UPLOAD_BATCH_SIZE]
+        res = dbx.files_upload_session_finish_batch_v2([arg for _, arg, _ in chunk])
+        for (url, entry, meta), result in zip(chunk, res.entries):
+            if result.is_success():
+                count += 1
+                _remember_validators(url, entry.commit.path, meta)
+            else:
+                app.logger.error("Upload commit failed [%s]: %s", entry.commit.path, result.get_failure())
+    return count
+
 # -----------------------------------------------------------------------------
 # PDF helpers
 # -----------------------------------------------------------------------------
-def _extract_pdf_links(html: str, base: str) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
+LIST_PAGE_CACHE_TTL_SECONDS = max(0, int(os.getenv("LIST_PAGE_CACHE_TTL_SECONDS", "600")))
+LIST_PAGE_CACHE_MAX_ENTRIES = 256
+_list_page_cache_lock = threading.Lock()
+_list_page_cache: dict[str, dict[str, object]] = {}
+
+# libxml2-backed parser for list pages the href regex cannot handle
+LIST_PAGE_PARSER = "lxml"
+
+def _uniq(items: Iterable[str]) -> List[str]:
+    """Deduplicate *items* in one pass, keeping first-seen order."""
+    seen: set[str] = set()
+    out: List[str] = []
+    add, append = seen.add, out.append
+    for x in items:
+        if x not in seen:
+            add(x)
+            append(x)
+    return out
+
+_A_HREF_RE = re.compile(r"""<a\b[^>]*?\shref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+
+_A_HREF_STRAINER = SoupStrainer("a", href=True)
+_PDF_SUFFIX_RE = re.compile(r"\.pdf\Z", re.IGNORECASE)
+
+def _page_hrefs(html: str) -> List[str]:
+    """
+    Return the href of every <a> tag. A compiled regex covers the normal case
+    without building a DOM; BeautifulSoup is only used when it finds nothing
+    (malformed or unusual markup).
+    """
+    hrefs = [html_unescape(m.group(1) or m.group(2) or m.group(3) or "").strip()
+             for m in _A_HREF_RE.finditer(html)]
+    if hrefs:
+        return hrefs
+    soup = BeautifulSoup(html, LIST_PAGE_PARSER, parse_only=_A_HREF_STRAINER)
+    return [a["href"].strip() for a in soup.find_all("a", href=True)]
+
+def _scan_page(html: str, base: str) -> tuple[List[str], List[str]]:
+    """Scan *html* once; return (deduplicated absolute .pdf links, all raw <a> hrefs)."""
+    hrefs = _page_hrefs(html)
     links = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
-        if href.lower().endswith(".pdf") and urlparse(href).scheme in ("http", "https"):
-            links.append(href)
-        elif href.lower().endswith(".pdf"):
-            links.append(urljoin(base, href))
-    return list(dict.fromkeys(links))
-
-def _case_variants(ext: str) -> List[str]:
-    if not ext:
-        return []
-    return [''.join(p) for p in product(*[(c.lower(), c.upper()) for c in ext])]
+    for href in hrefs:
+        if not _PDF_SUFFIX_RE.search(href):
+            continue
+        links.append(href if urlparse(href).scheme in ("http", "https") else urljoin(base, href))
+    return _uniq(links), hrefs
+
+# Extension spellings probed for Ontario blob candidates, in order.
+_PDF_CASE_VARIANTS = ("pdf", "PDF")
+
+def _pdf_case_variants(seen: Optional[str]) -> tuple[str, ...]:
+    """Spellings to probe for one root, starting with the one its list-page link used."""
+    if not seen or seen == _PDF_CASE_VARIANTS[0]:
+        return _PDF_CASE_VARIANTS
+    return tuple(_uniq((seen,) + _PDF_CASE_VARIANTS))
 
-def _try_get(url: str) -> Optional[bytes]:
+def _head_ok(url: str) -> bool:
     try:
-        r = session.get(url, timeout=DEFAULT_TIMEOUT)
-        r.raise_for_status()
-        return r.content
-    except requests.HTTPError:
-        return None
+        r = session.head(url, allow_redirects=True, timeout=DEFAULT_TIMEOUT)
+    except requests.RequestException:
+        return False
+    if r.status_code == 405:
+        # HEAD not supported: probe with a one-byte ranged GET instead
+        try:
+            with session.get(url, headers={"Range": "bytes=0-0"}, stream=True,
+                             allow_redirects=True, timeout=DEFAULT_TIMEOUT) as g:
+                return g.ok
+        except requests.RequestException:
+            return False
+    return r.ok
+
+def _first_existing(urls: tuple[str, ...]) -> Optional[str]:
+    """HEAD-probe *urls* in order and return the first that exists."""
+    for url in urls:
+        if _head_ok(url):
+            return url
+    return None
+
+def _probe_candidates(groups: List[tuple[str, ...]]) -> List[str]:
+    """Resolve each group of alternative URLs to at most one existing URL, probing groups in parallel."""
+    if not groups:
+        return []
+    with ThreadPoolExecutor(max_workers=min(PDF_PROBE_WORKERS, len(groups))) as pool:
+        return [url for url in pool.map(_first_existing, groups) if url]
+
+def _fetch_and_scan(list_page_url: str) -> tuple[List[str], List[str]]:
+    """
+    GET and scan an AR list page, reusing the result for LIST_PAGE_CACHE_TTL_SECONDS
+    (e.g. on retries). Past the TTL the page is revalidated with its ETag /
+    Last-Modified, so an unchanged page costs a 304 and no reparse.
+    """
+    now = time.time()
+    with _list_page_cache_lock:
+        entry = _list_page_cache.get(list_page_url)
+    if entry and (now - float(entry["ts"])) < LIST_PAGE_CACHE_TTL_SECONDS:
+        return list(entry["pdf_links"]), list(entry["hrefs"])
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    resp = session.get(list_page_url, headers=headers, timeout=DEFAULT_TIMEOUT)
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if entry and headers and resp.status_code == 304:
+        pdf_links, hrefs = entry["pdf_links"], entry["hrefs"]
+        etag = etag or entry.get("etag")
+        last_modified = last_modified or entry.get("last_modified")
+    else:
+        resp.raise_for_status()
+        pdf_links, hrefs = _scan_page(resp.text, list_page_url)
+
+    with _list_page_cache_lock:
+        _list_page_cache[list_page_url] = {
+            "ts": now,
+            "pdf_links": pdf_links,
+            "hrefs": hrefs,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        if len(_list_page_cache) > LIST_PAGE_CACHE_MAX_ENTRIES:
+            oldest = min(_list_page_cache, key=lambda k: float(_list_page_cache[k]["ts"]))
+            _list_page_cache.pop(oldest, None)
+    return list(pdf_links), list(hrefs)
+
+def _pdf_destinations(urls: List[str], folder: str) -> List[tuple[tuple[str, ...], str]]:
+    """
+    Group URLs by their Dropbox destination under *folder* (case-insensitive,
+    like Dropbox paths). Each destination is fetched and committed once, from
+    the first of its URLs that works — e.g. an Ontario probed blob URL, with
+    the page link as fallback — so two URLs never race to commit one path.
+    """
+    groups: dict[str, tuple[List[str], str]] = {}
+    prefix = folder + "/"
+    for url in urls:
+        dst = prefix + (urlparse(url).path.rpartition("/")[2] or "file.pdf")
+        groups.setdefault(dst.lower(), ([], dst))[0].append(url)
+    return [(tuple(alts), dst) for alts, dst in groups.values()]
 
 def download_ar_generic(ar_number: str, province: str, project: str,
                         list_page_url: str | None = None,
                         base_url: str | None = None,
                         stats_out: dict | None = None) -> int:
-    token = get_dropbox_access_token()
-    dbx = dropbox.Dropbox(token)
-    base = f"/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/1 - NEW REPORTS/{province}/{project}/{ar_number}"
+    dbx = get_dbx()
+    base = f"{AR_NEW_REPORTS_DIR}/{province}/{project}/{ar_number}"
     instr = f"{base}/Instructions"
     srcdata = f"{base}/Source Data"
-    for p in (base, instr, srcdata):
-        ensure_folder(dbx, p)
-    template_copies = 0
-    try:
-        dbx.files_copy_v2("/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/01_Instructions.xlsx",
-                          f"{instr}/{ar_number}_Instructions.xlsx", autorename=False)
-        template_copies += 1
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"Instructions copy failed: {e}")
-    try:
-        dbx.files_copy_v2("/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/ReportID_Geochemistry.gdb",
-                          f"{base}/{ar_number}_Geochemistry.gdb", autorename=False)
-        template_copies += 1
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"Geochemistry copy failed: {e}")
-    try:
-        dbx.files_copy_v2("/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/ReportID_DDH.gdb",
-                          f"{base}/{ar_number}_DDH.gdb", autorename=False)
-        template_copies += 1
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"DDH copy failed: {e}")
-    if isinstance(stats_out, dict):
-        stats_out["templates_copied"] = 1
-    if not list_page_url:
-        return 0
-    resp = session.get(list_page_url, timeout=DEFAULT_TIMEOUT)
-    resp.raise_for_status()
-    pdf_links = _extract_pdf_links(resp.text, list_page_url)
+    # The list page does not depend on the Dropbox setup: fetch it while the
+    # folders and template copies (which must stay in that order) run here.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        page = pool.submit(_fetch_and_scan, list_page_url) if list_page_url else None
+        ensure_folders(dbx, [base, instr, srcdata])
+        copy_report_templates(dbx, ar_number, base, instr)
+        if isinstance(stats_out, dict):
+            stats_out["templates_copied"] = 1
+        if page is None:
+            return 0
+        pdf_links, hrefs = page.result()
     more_links: List[str] = []
     if base_url:
-        soup = BeautifulSoup(resp.text, "html.parser")
-        hrefs = [a["href"].strip() for a in soup.find_all("a", href=True)]
-        candidates = []
+        # One pass over the hrefs: roots of .pdf links, and every root as fallback.
+        pdf_roots: List[str] = []
+        all_roots: List[str] = []
+        pdf_exts: dict[str, str] = {}
         for h in hrefs:
-            name = os.path.basename(h)
-            root, ext = os.path.splitext(name)
-            if ext and ext[1:].lower() == "pdf":
-                candidates.append(root)
-        if not candidates:
-            for h in hrefs:
-                name = os.path.basename(h)
-                root, _ = os.path.splitext(name)
-                if root:
-                    candidates.append(root)
-        candidates = list(dict.fromkeys(candidates))
-        for root in candidates:
-            for v in _case_variants("pdf"):
-                more_links.append(f"{base_url}/{ar_number}/{root}.{v}")
-    all_links = list(dict.fromkeys(pdf_links + more_links))
-    count = 0
-    for url in all_links:
-        try:
-            content = _try_get(url)
-            if not content:
-                continue
-            filename = os.path.basename(urlparse(url).path) or "file.pdf"
-            dbx.files_upload(content, f"{srcdata}/{filename}", mode=WriteMode.overwrite)
-            count += 1
-        except Exception as e:
-            app.logger.error(f"PDF upload error [{url}]: {e}")
-    return count
+            root, ext = os.path.splitext(h.rpartition("/")[2])
+            if _PDF_SUFFIX_RE.match(ext):
+                pdf_roots.append(root)
+                pdf_exts.setdefault(root, ext[1:])
+            if root:
+                all_roots.append(root)
+        candidates = _uniq(pdf_roots or all_roots)
+        prefix = f"{base_url}/{ar_number}/"
+        more_links = _probe_candidates([
+            tuple(f"{prefix}{root}.{v}" for v in _pdf_case_variants(pdf_exts.get(root)))
+            for root in candidates
+        ])
+    # Probed blob URLs first: the HEAD already confirmed them; page links are fallbacks
+    all_links = _uniq(chain(more_links, pdf_links))
+    sources = _pdf_destinations(all_links, srcdata)
+    try:
+        return dropbox_upload_urls(dbx, sources, stats_out=stats_out)
+    except Exception as e:
+        app.logger.error("PDF batch upload error [%s]: %s", ar_number, e)
+        return 0
 
 
 # -------------------- ADD: Manitoba direct-download logic --------------------
@@ -1062,47 +1594,22 @@ def download_ar_manitoba(ar_number: str, province: str, project: str, stats_out:
     Manitoba: direct download of a single PDF:
     https://www.gov.mb.ca/data/em/application/assessment/{ar_number}.pdf
     """
-    token = get_dropbox_access_token()
-    dbx = dropbox.Dropbox(token)
+    dbx = get_dbx()
 
-    base = f"/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/1 - NEW REPORTS/{province}/{project}/{ar_number}"
+    base = f"{AR_NEW_REPORTS_DIR}/{province}/{project}/{ar_number}"
     instr = f"{base}/Instructions"
     srcdata = f"{base}/Source Data"
 
     # Create folders and copy templates (same flow as other provinces)
-    for p in (base, instr, srcdata):
-        ensure_folder(dbx, p)
-    template_copies = 0
-    try:
-        dbx.files_copy_v2("/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/01_Instructions.xlsx",
-                          f"{instr}/{ar_number}_Instructions.xlsx", autorename=False)
-        template_copies += 1
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"Instructions copy failed: {e}")
-    try:
-        dbx.files_copy_v2("/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/ReportID_Geochemistry.gdb",
-                          f"{base}/{ar_number}_Geochemistry.gdb", autorename=False)
-        template_copies += 1
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"Geochemistry copy failed: {e}")
-    try:
-        dbx.files_copy_v2("/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/ReportID_DDH.gdb",
-                          f"{base}/{ar_number}_DDH.gdb", autorename=False)
-        template_copies += 1
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"DDH copy failed: {e}")
+    ensure_folders(dbx, [base, instr, srcdata])
+    copy_report_templates(dbx, ar_number, base, instr)
     if isinstance(stats_out, dict):
         stats_out["templates_copied"] = 1
 
     # Direct PDF URL without suffix permutations
     url = f"https://www.gov.mb.ca/data/em/application/assessment/{ar_number}.pdf"
-    content = _try_get(url)
-    if not content:
-        return 0
-
     filename = os.path.basename(urlparse(url).path) or f"{ar_number}.pdf"
-    dbx.files_upload(content, f"{srcdata}/{filename}", mode=WriteMode.overwrite)
-    return 1
+    return 1 if stream_to_dropbox(dbx, url, f"{srcdata}/{filename}") else 0
 # -----------------------------------------------------------------------------
 
 
@@ -1254,7 +1761,7 @@ def _nb_navigate_back(nb_session, sub_soup, fa_url: str):
         parent_soup = BeautifulSoup(r.text, "html.parser")
         return parent_soup, _nb_hidden(parent_soup)
     except Exception as e:
-        app.logger.error(f"NB: navigate-back failed: {e}")
+        app.logger.error("NB: navigate-back failed: %s", e)
         return None, None
 
 
@@ -1282,21 +1789,21 @@ def _nb_download_folder(nb_session, dbx, soup, fa_url: str,
                                  timeout=_NB_TIMEOUT, verify=_NB_SSL_VERIFY)
             rf.raise_for_status()
             if "text/html" in rf.headers.get("Content-Type", ""):
-                app.logger.warning(f"NB:{indent} PostBack returned HTML for '{label}', skipping")
+                app.logger.warning("NB:%s PostBack returned HTML for '%s', skipping", indent, label)
                 continue
             fname = _nb_safe_name(_nb_filename(rf, label))
             dbx.files_upload(rf.content, f"{dropbox_path}/{fname}", mode=WriteMode.overwrite)
             count += 1
-            app.logger.info(f"NB:{indent} uploaded '{fname}' ({len(rf.content):,} bytes)")
+            app.logger.info("NB:%s uploaded '%s' (%d bytes)", indent, fname, len(rf.content))
         except Exception as e:
-            app.logger.error(f"NB:{indent} error downloading '{label}': {e}")
+            app.logger.error("NB:%s error downloading '%s': %s", indent, label, e)
 
     # ── 2. Recurse into subfolders ─────────────────────────────────────────────
     current_soup   = soup
     current_hidden = hidden_fields
 
     for i, (label, target, arg) in enumerate(folders):
-        app.logger.info(f"NB:{indent} [folder] {label}/")
+        app.logger.info("NB:%s [folder] %s/", indent, label)
         post_data = {**current_hidden, "__EVENTTARGET": target, "__EVENTARGUMENT": arg}
         try:
             time.sleep(_NB_DELAY)
@@ -1307,7 +1814,7 @@ def _nb_download_folder(nb_session, dbx, soup, fa_url: str,
 
             if "text/html" not in ct:
                 # Table misidentified it as a folder — save as file instead
-                app.logger.warning(f"NB:{indent}  '{label}' has no size but returned binary; saving as file")
+                app.logger.warning("NB:%s  '%s' has no size but returned binary; saving as file", indent, label)
                 fname = _nb_safe_name(_nb_filename(r, label))
                 dbx.files_upload(r.content, f"{dropbox_path}/{fname}", mode=WriteMode.overwrite)
                 count += 1
@@ -1327,12 +1834,12 @@ def _nb_download_folder(nb_session, dbx, soup, fa_url: str,
                     current_hidden = back_hidden
                 else:
                     app.logger.warning(
-                        f"NB: could not navigate back from '{label}'; "
-                        "remaining sibling folders may be skipped")
+                        "NB: could not navigate back from '%s'; "
+                        "remaining sibling folders may be skipped", label)
                     break
 
         except Exception as e:
-            app.logger.error(f"NB:{indent} error entering folder '{label}': {e}")
+            app.logger.error("NB:%s error entering folder '%s': %s", indent, label, e)
 
     return count
 
@@ -1351,34 +1858,15 @@ def download_ar_nb(ar_number: str, province: str, project: str,
     3. Submit "List Digital Files" button → FileAdmin page
     4. PostBack-download each file → upload to Dropbox
     """
-    token = get_dropbox_access_token()
-    dbx = dropbox.Dropbox(token)
+    dbx = get_dbx()
 
-    base    = f"/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/1 - NEW REPORTS/{province}/{project}/{ar_number}"
+    base    = f"{AR_NEW_REPORTS_DIR}/{province}/{project}/{ar_number}"
     instr   = f"{base}/Instructions"
     srcdata = f"{base}/Source Data"
 
     # ── Create folders and copy templates (same as all other provinces) ────────
-    for p in (base, instr, srcdata):
-        ensure_folder(dbx, p)
-    try:
-        dbx.files_copy_v2(
-            "/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/01_Instructions.xlsx",
-            f"{instr}/{ar_number}_Instructions.xlsx", autorename=False)
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"NB instructions copy failed: {e}")
-    try:
-        dbx.files_copy_v2(
-            "/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/ReportID_Geochemistry.gdb",
-            f"{base}/{ar_number}_Geochemistry.gdb", autorename=False)
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"NB geochemistry copy failed: {e}")
-    try:
-        dbx.files_copy_v2(
-            "/KENORLAND_DIGITIZING/ASSESSMENT_REPORTS/_Documents/Instructions/ReportID_DDH.gdb",
-            f"{base}/{ar_number}_DDH.gdb", autorename=False)
-    except dropbox.exceptions.ApiError as e:
-        app.logger.warning(f"NB DDH copy failed: {e}")
+    ensure_folders(dbx, [base, instr, srcdata])
+    copy_report_templates(dbx, ar_number, base, instr, log_prefix="NB ")
     if isinstance(stats_out, dict):
         stats_out["templates_copied"] = 1
 
@@ -1411,7 +1899,7 @@ def download_ar_nb(ar_number: str, province: str, project: str,
 
     field = _nb_find_report_field(soup1)
     if not field:
-        app.logger.error(f"NB: cannot find report-number input for {ar_number}")
+        app.logger.error("NB: cannot find report-number input for %s", ar_number)
         return 0
 
     submit_btn = next(
@@ -1428,7 +1916,7 @@ def download_ar_nb(ar_number: str, province: str, project: str,
         None
     )
     if not row_link:
-        app.logger.warning(f"NB: report {ar_number} not found in search results")
+        app.logger.warning("NB: report %s not found in search results", ar_number)
         return 0
 
     m = re.search(r"__doPostBack\('([^']+)','([^']*)'\)", row_link.get("href", ""))
@@ -1448,7 +1936,7 @@ def download_ar_nb(ar_number: str, province: str, project: str,
             list_btn = inp
             break
     if not list_btn:
-        app.logger.warning(f"NB: 'List Digital Files' button not found for {ar_number}")
+        app.logger.warning("NB: 'List Digital Files' button not found for %s", ar_number)
         return 0
 
     r4 = _post(_NB_DETAIL_URL, {
@@ -1459,12 +1947,17 @@ def download_ar_nb(ar_number: str, province: str, project: str,
 
     # ── Step 4: Recursively download all files/subfolders → Dropbox ───────────
     count = _nb_download_folder(nb, dbx, soup4, r4.url, srcdata)
-    app.logger.info(f"NB: {count} file(s) uploaded for {ar_number}")
+    app.logger.info("NB: %s file(s) uploaded for %s", count, ar_number)
     return count
 # -----------------------------------------------------------------------------
 
 
 ASX_DROPBOX_PREFIX = "/KENORLAND_DIGITIZING/ASX/2 - WORKING/"
+ASX_UNLOCK_SPOOL_BYTES = 8 * 1024 * 1024  # unlocked PDFs larger than this spill to a temp file
+# Optional process pool for qpdf work (0 = unlock inline in the request thread).
+ASX_UNLOCK_PROCESSES = max(0, int(os.getenv("ASX_UNLOCK_PROCESSES", "0")))
+_unlock_pool: ProcessPoolExecutor | None = None
+_unlock_pool_lock = threading.Lock()
 
 def _is_allowed_asx_path(path: str) -> bool:
     return isinstance(path, str) and path.startswith(ASX_DROPBOX_PREFIX)
@@ -1476,38 +1969,118 @@ def _check_bearer(req) -> None:
     if req.headers.get("Authorization", "") != f"Bearer {expected}":
         raise PermissionError("Unauthorized")
 
-def _unlock_pdf_bytes(data: bytes) -> bytes:
+def _unlock_pdf(stream: IO[bytes]) -> IO[bytes]:
     """
     Removes owner restrictions and writes an unencrypted copy when possible.
     Supports files that can be opened with an empty user password ("").
-    If a real non-empty user password is required or any error happens, return original bytes.
+    Works on seekable file objects so large uploads are never copied into
+    memory whole: the unlocked copy is spooled to disk past ASX_UNLOCK_SPOOL_BYTES.
+    If a real non-empty user password is required or any error happens, return
+    the original stream, rewound.
     """
-    import io
-    import pikepdf
+    # pikepdf's default password is "", which covers both unencrypted files and
+    # an empty user password, so one open attempt is enough.
+    stream.seek(0)
+    try:
+        pdf = pikepdf.open(stream)
+    except (PasswordError, PdfError, OSError):
+        # Real user password required, or not a readable PDF: keep original file
+        stream.seek(0)
+        return stream
+    with pdf:
+        if not pdf.is_encrypted:
+            # Nothing to remove: skip the qpdf rewrite and upload the original
+            stream.seek(0)
+            return stream
+        out = tempfile.SpooledTemporaryFile(max_size=ASX_UNLOCK_SPOOL_BYTES)
+        try:
+            # IMPORTANT: save without encryption args to produce a plain, non-password PDF.
+            # The remaining options keep content streams verbatim (no decode,
+            # re-compress, normalization or linearization), so qpdf only rewrites
+            # the xref and drops /Encrypt.
+            pdf.save(
+                out,
+                object_stream_mode=pikepdf.ObjectStreamMode.preserve,
+                stream_decode_level=pikepdf.StreamDecodeLevel.none,
+                normalize_content=False,
+                linearize=False,
+            )
+        except (PdfError, OSError):
+            out.close()
+            stream.seek(0)
+            return stream
+    out.seek(0)
+    return out
+
+
+def _unlock_pdf_bytes(data: bytes) -> Optional[bytes]:
+    """Process-pool entry point: unlocked PDF bytes, or None to keep the original."""
+    src = BytesIO(data)
+    out = _unlock_pdf(src)
+    if out is src:
+        return None
+    try:
+        return out.read()
+    finally:
+        out.close()
 
-    # Try without password first, then with an empty password
-    for pw in (None, ""):
+
+def _get_unlock_pool() -> ProcessPoolExecutor:
+    global _unlock_pool
+    with _unlock_pool_lock:
+        if _unlock_pool is None:
+            # spawn, not fork: the gunicorn worker is multi-threaded by then
+            _unlock_pool = ProcessPoolExecutor(
+                max_workers=ASX_UNLOCK_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _unlock_pool
+
+
+def unlock_pdf(stream: IO[bytes]) -> IO[bytes]:
+    """
+    Unlock inline, or in the process pool when ASX_UNLOCK_PROCESSES > 0 so
+    concurrent unlocks use every core. The pool path ships the PDF to the child
+    as bytes, trading the streaming memory profile for parallelism.
+    """
+    if not ASX_UNLOCK_PROCESSES:
+        return _unlock_pdf(stream)
+    stream.seek(0)
+    data = _get_unlock_pool().submit(_unlock_pdf_bytes, stream.read()).result()
+    if data is None:
+        stream.seek(0)
+        return stream
+    return BytesIO(data)
+
+
+def run_asx_unlock_upload(src: IO[bytes], path: str) -> tuple[dict, int]:
+    """Unlock *src* if possible and upload it to *path*; return (payload, status_code)."""
+    try:
+        unlocked = unlock_pdf(src)
         try:
-            pdf = pikepdf.open(io.BytesIO(data), password=pw)
-            try:
-                out = io.BytesIO()
-                # IMPORTANT: save without encryption args to produce a plain, non-password PDF
-                pdf.save(out)
-                pdf.close()
-                return out.getvalue()
-            finally:
-                try:
-                    pdf.close()
-                except Exception:
-                    pass
-        except (pikepdf.PasswordError, getattr(pikepdf, "_qpdf", type("", (), {})) .__dict__.get("PasswordError", Exception)):
-            # Real user password is required; keep original file
-            continue
-        except Exception:
-            # Any other error: fall back to original bytes
-            break
+            dbx = get_dbx()
+            dropbox_upload_fileobj(dbx, unlocked, path)
+        finally:
+            if unlocked is not src:
+                unlocked.close()
+    except Exception as e:
+        track_asx_stats("unlock_upload", 0, False)
+        app.logger.error("/asx_unlock_upload error: %s", e, exc_info=True)
+        return {"error": str(e)}, 500
+    track_asx_stats("unlock_upload", 1, True)
+    return {"message": "Uploaded (unlocked if possible)", "path": path}, 200
 
-    return data
+
+def _asx_unlock_job(spool_path: str, path: str) -> tuple[dict, int]:
+    """Background variant: the upload was copied to *spool_path*, removed when done."""
+    try:
+        with open(spool_path, "rb") as src:
+            return run_asx_unlock_upload(src, path)
+    finally:
+        try:
+            os.remove(spool_path)
+        except OSError:
+            pass
 
 
 @app.post("/asx_unlock_upload")
@@ -1538,54 +2111,146 @@ def asx_unlock_upload():
         return jsonify(payload), 400
 
     try:
-        data = f.read()
-        if not data:
+        # Work on werkzeug's spooled upload stream instead of f.read(): the
+        # PDF is never held in memory as a separate full copy.
+        src = f.stream
+        src.seek(0, os.SEEK_END)
+        if src.tell() == 0:
             payload = {"error": "Empty file"}
             _idempotency_finish(idem_key, payload, 400)
             return jsonify(payload), 400
 
-        unlocked = _unlock_pdf_bytes(data)
-
-        token = get_dropbox_access_token()
-        dbx = dropbox.Dropbox(token)
-        dbx.files_upload(unlocked, path, mode=WriteMode.overwrite)
-        track_asx_stats("unlock_upload", 1, True)
-
-        payload = {"message": "Uploaded (unlocked if possible)", "path": path}
-        _idempotency_finish(idem_key, payload, 200)
-        return jsonify(payload), 200
+        if str(request.form.get("async", "")).strip().lower() in ("1", "true"):
+            # werkzeug's upload stream dies with the request: hand the job its own copy
+            src.seek(0)
+            os.makedirs(JOBS_DIR, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=JOBS_DIR, suffix=".upload", delete=False) as tmp:
+                shutil.copyfileobj(src, tmp)
+            job_id = submit_job("asx_unlock_upload", _asx_unlock_job, tmp.name, path)
+            payload = {"job_id": job_id, "status": "queued", "status_url": url_for("job_status", job_id=job_id)}
+            _idempotency_finish(idem_key, payload, 202)
+            return jsonify(payload), 202
+
+        payload, status_code = run_asx_unlock_upload(src, path)
+        _idempotency_finish(idem_key, payload, status_code)
+        return jsonify(payload), status_code
     except Exception as e:
         track_asx_stats("unlock_upload", 0, False)
-        app.logger.error(f"/asx_unlock_upload error: {e}", exc_info=True)
+        app.logger.error("/asx_unlock_upload error: %s", e, exc_info=True)
         _idempotency_abort(idem_key)
         return jsonify(error=str(e)), 500
 
 
+# -----------------------------------------------------------------------------
+# Background jobs (opt-in async mode for long-running endpoints)
+# -----------------------------------------------------------------------------
+# Job records are JSON files so every gunicorn worker on the host can answer
+# /jobs/<id>, whichever worker accepted the job.
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "4")))
+JOB_TTL_SECONDS = max(300, int(os.getenv("JOB_TTL_SECONDS", "86400")))
+JOBS_DIR = os.getenv(
+    "JOBS_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "stats", "jobs")),
+)
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_job_context = threading.local()
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _write_job(job_id: str, record: dict) -> None:
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    tmp = _job_path(job_id) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp, _job_path(job_id))
+
+
+def read_job(job_id: str) -> Optional[dict]:
+    if not _JOB_ID_RE.match(str(job_id or "")):
+        return None
+    try:
+        with open(_job_path(job_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cleanup_jobs() -> None:
+    cutoff = time.time() - JOB_TTL_SECONDS
+    try:
+        names = os.listdir(JOBS_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(JOBS_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def report_job_progress(**fields) -> None:
+    """Merge *fields* into the running job's "progress"; a no-op outside a job thread."""
+    job_id = getattr(_job_context, "job_id", None)
+    if not job_id:
+        return
+    record = read_job(job_id)
+    if record is None:
+        return
+    record.setdefault("progress", {}).update(fields)
+    record["updated_at"] = utc_now_iso()
+    _write_job(job_id, record)
+
+
+def _run_job(job_id: str, kind: str, fn, args: tuple) -> None:
+    record = read_job(job_id) or {"job_id": job_id, "kind": kind}
+    record.update(status="running", updated_at=utc_now_iso())
+    _write_job(job_id, record)
+    _job_context.job_id = job_id
+    try:
+        payload, status_code = fn(*args)
+    except Exception as e:
+        app.logger.error("Job %s (%s) failed: %s", job_id, kind, e, exc_info=True)
+        payload, status_code = {"error": str(e)}, 500
+    finally:
+        _job_context.job_id = None
+    record = read_job(job_id) or record
+    record.update(status="done", status_code=status_code, result=payload, updated_at=utc_now_iso())
+    _write_job(job_id, record)
+
+
+def submit_job(kind: str, fn, *args) -> str:
+    """Queue fn(*args) -> (payload, status_code) on the background pool; return the job id."""
+    _cleanup_jobs()
+    job_id = uuid.uuid4().hex
+    now = utc_now_iso()
+    _write_job(job_id, {"job_id": job_id, "kind": kind, "status": "queued", "created_at": now, "updated_at": now})
+    _job_executor.submit(_run_job, job_id, kind, fn, args)
+    return job_id
+
 # -----------------------------------------------------------------------------
 # API route
 # -----------------------------------------------------------------------------
-@app.route("/download_gm", methods=["POST"])
-def download_gm():
-    idem_key = _idempotency_key("download_gm")
-    idem_state, idem_cached = _idempotency_begin(idem_key)
-    if idem_state == "cached" and isinstance(idem_cached, dict):
-        return jsonify(idem_cached.get("payload", {})), int(idem_cached.get("status_code", 200))
-    if idem_state == "in_progress":
-        return jsonify(error="Duplicate request in progress"), 409
+def _ar_request_supported(prov: str, num: str) -> bool:
+    if prov == "Quebec":
+        return num.upper().startswith("GM")
+    return prov in ("Ontario", "New Brunswick", "Nunavut", "Manitoba")
 
-    data = request.get_json(force=True, silent=True) or {}
-    num  = str(data.get("ar_number", "")).strip()
-    prov = str(data.get("province", "")).strip()
-    proj = str(data.get("project", "")).strip()
-    if not all([num, prov, proj]):
-        payload = {"error": "Missing parameters"}
-        _idempotency_finish(idem_key, payload, 400)
-        return jsonify(payload), 400
+
+def run_ar_download(num: str, prov: str, proj: str) -> tuple[dict, int]:
+    """Run the per-AR workflow for one report; return (payload, status_code)."""
+    if not _ar_request_supported(prov, num):
+        return {"error": "Invalid province or AR#"}, 400
     cnt = 0
     stats_out: dict = {}
     tpl = 0
     try:
-        if prov == "Quebec" and num.upper().startswith("GM"):
+        if prov == "Quebec":
             url = f"https://gq.mines.gouv.qc.ca/documents/EXAMINE/{num}/"
             cnt = download_ar_generic(num, prov, proj, url, stats_out=stats_out)
         elif prov == "Ontario":
@@ -1598,26 +2263,70 @@ def download_gm():
             cnt = download_ar_generic(num, prov, proj, stats_out=stats_out)
         elif prov == "Manitoba":
             cnt = download_ar_manitoba(num, prov, proj, stats_out=stats_out)
-        else:
-            payload = {"error": "Invalid province or AR#"}
-            _idempotency_finish(idem_key, payload, 400)
-            return jsonify(payload), 400
         tpl = int(stats_out.get("templates_copied", 0) or 0)
+        up_to_date = int(stats_out.get("pdfs_up_to_date", 0) or 0)
         track_download_stats(prov, num, cnt, tpl, True)
-        msg = f"Downloaded {cnt} PDFs" if cnt > 0 else "Folders created. No PDFs downloaded."
+        if cnt > 0:
+            msg = f"Downloaded {cnt} PDFs"
+            if up_to_date:
+                msg += f", {up_to_date} already up to date"
+        elif up_to_date:
+            msg = f"{up_to_date} PDFs up to date"
+        else:
+            msg = "Folders created. No PDFs downloaded."
         payload = {"message": msg, "downloaded_pdfs": cnt, "templates_copied": tpl}
-        _idempotency_finish(idem_key, payload, 200)
-        return jsonify(payload), 200
+        if up_to_date:
+            payload["up_to_date_pdfs"] = up_to_date
+        return payload, 200
     except requests.HTTPError as he:
         track_download_stats(prov, num, cnt, tpl, False)
-        app.logger.error(f"HTTP error: {he}", exc_info=True)
-        _idempotency_abort(idem_key)
-        return jsonify(error=str(he)), 502
+        app.logger.error("HTTP error: %s", he, exc_info=True)
+        return {"error": str(he)}, 502
     except Exception as e:
         track_download_stats(prov, num, cnt, tpl, False)
-        app.logger.error(f"Unexpected error: {e}", exc_info=True)
-        _idempotency_abort(idem_key)
-        return jsonify(error=str(e)), 500
+        app.logger.error("Unexpected error: %s", e, exc_info=True)
+        return {"error": str(e)}, 500
+
+
+@app.route("/download_gm", methods=["POST"])
+def download_gm():
+    idem_key = _idempotency_key("download_gm")
+    idem_state, idem_cached = _idempotency_begin(idem_key)
+    if idem_state == "cached" and isinstance(idem_cached, dict):
+        return jsonify(idem_cached.get("payload", {})), int(idem_cached.get("status_code", 200))
+    if idem_state == "in_progress":
+        return jsonify(error="Duplicate request in progress"), 409
+
+    data = request.get_json(force=True, silent=True) or {}
+    num  = str(data.get("ar_number", "")).strip()
+    prov = str(data.get("province", "")).strip()
+    proj = str(data.get("project", "")).strip()
+    if not all([num, prov, proj]):
+        payload = {"error": "Missing parameters"}
+        _idempotency_finish(idem_key, payload, 400)
+        return jsonify(payload), 400
+
+    if data.get("async") is True:
+        if not _ar_request_supported(prov, num):
+            payload = {"error": "Invalid province or AR#"}
+            _idempotency_finish(idem_key, payload, 400)
+            return jsonify(payload), 400
+        job_id = submit_job("download_gm", run_ar_download, num, prov, proj)
+        payload = {"job_id": job_id, "status": "queued", "status_url": url_for("job_status", job_id=job_id)}
+        _idempotency_finish(idem_key, payload, 202)
+        return jsonify(payload), 202
+
+    payload, status_code = run_ar_download(num, prov, proj)
+    _idempotency_finish(idem_key, payload, status_code)
+    return jsonify(payload), status_code
+
+
+@app.get("/jobs/<job_id>")
+def job_status(job_id: str):
+    record = read_job(job_id)
+    if record is None:
+        return jsonify(error="Job not found"), 404
+    return jsonify(record), 200
 
 # -----------------------------------------------------------------------------
 # Error handler
@@ -1626,7 +2335,7 @@ def download_gm():
 def all_errors(e):
     if isinstance(e, HTTPException):
         return e
-    app.logger.error(f"Unhandled: {e}", exc_info=True)
+    app.logger.error("Unhandled: %s", e, exc_info=True)
     return jsonify(error="Internal server error"), 500
 
 # -----------------------------------------------------------------------------
@@ -1641,7 +2350,7 @@ def api_stats():
         payload = StatsStore.to_api_payload(state, period=period)
         return jsonify(payload), 200
     except Exception as e:
-        app.logger.warning(f"Stats read failed: {e}")
+        app.logger.warning("Stats read failed: %s", e)
         fallback = StatsStore.to_api_payload(None, period="all")
         return jsonify(fallback), 200
 
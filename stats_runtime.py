@@ -152,11 +152,13 @@ class StatsStore:
         local_path: Optional[str] = None,
         token_provider=None,
         logger=None,
+        client_provider=None,
     ):
         self.backend = (backend or "file").strip().lower()
         self.dropbox_path = dropbox_path
         self.local_path = local_path or get_default_stats_path()
         self.token_provider = token_provider
+        self.client_provider = client_provider
         self._logger = logger
         self._lock = threading.Lock()
 
@@ -199,6 +201,9 @@ class StatsStore:
     def _build_dbx(self):
         import dropbox
 
+        # Prefer the app's shared client (pooled connections) when one is provided
+        if callable(self.client_provider):
+            return self.client_provider()
         token = ""
         if callable(self.token_provider):
             token = str(self.token_provider() or "").strip()
@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+BLOB = "https://blob.example/assessment"
+PAGE = "https://page.example/records/2.1234.html"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b""):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = {}
+        self._body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise main.requests.HTTPError(str(self.status_code))
+
+    def iter_content(self, chunk_size):
+        yield self._body
+
+
+class FakeSession:
+    def __init__(self, routes):
+        self.routes = routes
+        self.gets = []
+
+    def get(self, url, **kwargs):
+        self.gets.append(url)
+        return FakeResponse(*self.routes.get(url, (404,)))
+
+    def head(self, url, **kwargs):
+        return FakeResponse(self.routes.get(url, (404,))[0])
+
+
+class FakeResult:
+    def is_success(self):
+        return True
+
+
+class FakeBatch:
+    def __init__(self, n):
+        self.entries = [FakeResult() for _ in range(n)]
+
+
+class FakeDropbox:
+    def __init__(self):
+        self.committed = []
+
+    def files_upload_session_finish_batch_v2(self, entries):
+        self.committed.extend(e.commit.path for e in entries)
+        return FakeBatch(len(entries))
+
+
+@pytest.fixture
+def dbx(monkeypatch):
+    fake = FakeDropbox()
+    monkeypatch.setattr(main, "get_dbx", lambda: fake)
+    monkeypatch.setattr(main, "ensure_folders", lambda *a, **k: None)
+    monkeypatch.setattr(main, "copy_report_templates", lambda *a, **k: 3)
+    monkeypatch.setattr(main, "_upload_session_push",
+                        lambda dbx, sid, off, data, close: ("sid", off + len(data)))
+    monkeypatch.setattr(main, "_pdf_validators", {})
+    return fake
+
+
+def test_probed_blob_is_used_when_page_link_404s(monkeypatch, dbx):
+    page_pdf = "https://page.example/x/Root1.PDF"
+    blob_pdf = f"{BLOB}/2.1234/Root1.PDF"
+    fake = FakeSession({blob_pdf: (200, b"%PDF-1.4")})
+    monkeypatch.setattr(main, "session", fake)
+    monkeypatch.setattr(main, "_fetch_and_scan", lambda url: ([page_pdf], ["/x/Root1.PDF"]))
+
+    count = main.download_ar_generic("2.1234", "Ontario", "Proj", PAGE, BLOB)
+
+    assert count == 1
+    assert blob_pdf in fake.gets
+    assert [p.rsplit("/", 1)[1] for p in dbx.committed] == ["Root1.PDF"]
+
+
+def test_stage_pdf_falls_through_to_next_url(monkeypatch, dbx):
+    first, second = "https://a.example/f.pdf", "https://b.example/f.pdf"
+    fake = FakeSession({first: (404,), second: (200, b"%PDF-1.4")})
+    monkeypatch.setattr(main, "session", fake)
+
+    arg, meta = main._stage_pdf(dbx, (first, second), "/Src/f.pdf")
+
+    assert arg is not None
+    assert meta["url"] == second
+    assert fake.gets == [first, second]